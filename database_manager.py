@@ -0,0 +1,19 @@
+import os
+import logging
+from supabase import create_client, Client
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# --- CONFIGURATION ---
+SUPABASE_URL = os.environ.get("SUPABASE_URL")
+SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
+
+if not SUPABASE_URL or not SUPABASE_KEY:
+    logging.getLogger("Database").critical("❌ Missing Supabase Config! Check .env file.")
+    exit(1)
+
+# --- SHARED CLIENT ---
+# Created once at import. Every module in the process goes through this client,
+# so its keep-alive HTTP pool is reused instead of each module reconnecting on its own.
+supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
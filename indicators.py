@@ -0,0 +1,219 @@
+import numpy as np
+
+# --- OPTIONAL JIT ---
+# Kernels compile to native code when numba is installed and run as plain Python otherwise.
+# nogil lets them run in worker threads alongside the event loop.
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]): return args[0]
+        return lambda fn: fn
+
+# ==============================================================================
+#  MACD
+# ==============================================================================
+
+@njit(cache=True, nogil=True, fastmath=True)
+def macd_full(close, fast, slow, signal):
+    """
+    Full MACD pass with pandas_ta seeding (each EMA starts from the SMA of its first window).
+    Returns (ema_fast, ema_slow, signal, prev_macd, prev_signal) at the last bar.
+    """
+    a_f = 2.0 / (fast + 1)
+    a_s = 2.0 / (slow + 1)
+    a_g = 2.0 / (signal + 1)
+    n = close.shape[0]
+
+    ema_f = 0.0
+    for i in range(fast): ema_f += close[i]
+    ema_f /= fast
+    for i in range(fast, slow):
+        ema_f = a_f * close[i] + (1.0 - a_f) * ema_f
+
+    ema_s = 0.0
+    for i in range(slow): ema_s += close[i]
+    ema_s /= slow
+
+    macd = np.empty(n - slow + 1)
+    macd[0] = ema_f - ema_s
+    for i in range(slow, n):
+        ema_f = a_f * close[i] + (1.0 - a_f) * ema_f
+        ema_s = a_s * close[i] + (1.0 - a_s) * ema_s
+        macd[i - slow + 1] = ema_f - ema_s
+
+    sig = 0.0
+    for i in range(signal): sig += macd[i]
+    sig /= signal
+    prev_sig = sig
+    for i in range(signal, macd.shape[0]):
+        prev_sig = sig
+        sig = a_g * macd[i] + (1.0 - a_g) * sig
+
+    return ema_f, ema_s, sig, macd[macd.shape[0] - 2], prev_sig
+
+# ==============================================================================
+#  LAST-VALUE KERNELS
+# ==============================================================================
+
+@njit(cache=True, nogil=True)
+def rsi_last(close, length):
+    """
+    RSI at the last bar only, matching pandas_ta (Wilder RMA as an adjusted EWM).
+    The EWM normaliser is shared by both averages, so it cancels out of the ratio.
+    """
+    decay = 1.0 - 1.0 / length
+    up = 0.0
+    down = 0.0
+    for i in range(1, close.shape[0]):
+        d = close[i] - close[i - 1]
+        up = decay * up + (d if d > 0 else 0.0)
+        down = decay * down + (-d if d < 0 else 0.0)
+    if up + down == 0.0: return np.nan
+    return 100.0 * up / (up + down)
+
+# ==============================================================================
+#  SUPERTREND / ADX
+# ==============================================================================
+@njit(cache=True, nogil=True)
+def rma(x, length):
+    """
+    Wilder's moving average with pandas_ta semantics: ewm(alpha=1/length, min_periods=length),
+    adjusted, with NaNs treated the way pandas does (they decay the weights but add no observation).
+    """
+    n = x.shape[0]
+    out = np.empty(n)
+    decay = 1.0 - 1.0 / length
+    weighted = x[0]
+    nobs = 0 if np.isnan(weighted) else 1
+    old_wt = 1.0
+    out[0] = weighted if nobs >= length else np.nan
+    for i in range(1, n):
+        cur = x[i]
+        is_obs = not np.isnan(cur)
+        if is_obs: nobs += 1
+        if not np.isnan(weighted):
+            old_wt *= decay
+            if is_obs:
+                if weighted != cur:
+                    weighted = (old_wt * weighted + cur) / (old_wt + 1.0)
+                old_wt += 1.0
+        elif is_obs:
+            weighted = cur
+        out[i] = weighted if nobs >= length else np.nan
+    return out
+
+@njit(cache=True, nogil=True)
+def true_range(high, low, close):
+    n = close.shape[0]
+    tr = np.empty(n)
+    tr[0] = np.nan
+    for i in range(1, n):
+        tr[i] = max(abs(high[i] - low[i]), abs(high[i] - close[i - 1]), abs(close[i - 1] - low[i]))
+    return tr
+
+@njit(cache=True, nogil=True)
+def supertrend_dir(high, low, close, length, multiplier):
+    """Supertrend direction per bar (+1 up, -1 down), matching pandas_ta's SUPERTd column."""
+    n = close.shape[0]
+    atr = rma(true_range(high, low, close), length)
+    upper = np.empty(n)
+    lower = np.empty(n)
+    for i in range(n):
+        mid = 0.5 * (high[i] + low[i])
+        upper[i] = mid + multiplier * atr[i]
+        lower[i] = mid - multiplier * atr[i]
+
+    direction = np.ones(n)
+    for i in range(1, n):
+        if close[i] > upper[i - 1]:
+            direction[i] = 1.0
+        elif close[i] < lower[i - 1]:
+            direction[i] = -1.0
+        else:
+            direction[i] = direction[i - 1]
+            # Bands only ratchet in the trend's favour
+            if direction[i] > 0 and lower[i] < lower[i - 1]: lower[i] = lower[i - 1]
+            if direction[i] < 0 and upper[i] > upper[i - 1]: upper[i] = upper[i - 1]
+    return direction
+
+# error_model='numpy': a flat market gives 0/0 here, which must become NaN as in pandas, not raise
+@njit(cache=True, nogil=True, error_model='numpy')
+def adx(high, low, close, length):
+    """ADX series matching pandas_ta's ADX_<length> column (RMA smoothing, lensig = length)."""
+    n = close.shape[0]
+    atr = rma(true_range(high, low, close), length)
+    pos = np.empty(n)
+    neg = np.empty(n)
+    pos[0] = np.nan
+    neg[0] = np.nan
+    for i in range(1, n):
+        up = high[i] - high[i - 1]
+        dn = low[i - 1] - low[i]
+        pos[i] = up if (up > dn and up > 0) else 0.0
+        neg[i] = dn if (dn > up and dn > 0) else 0.0
+    dmp = rma(pos, length)
+    dmn = rma(neg, length)
+
+    dx = np.empty(n)
+    for i in range(n):
+        k = 100.0 / atr[i]
+        p = k * dmp[i]
+        m = k * dmn[i]
+        dx[i] = 100.0 * abs(p - m) / (p + m)
+    return rma(dx, length)
+
+@njit(cache=True, nogil=True)
+def sma(x, length):
+    """
+    Simple moving average aligned with x, NaN until the first full window (like rolling(length).mean()).
+    One running sum slides across the series, O(n) rather than O(n * length); like pandas it is
+    Kahan-compensated, so the drift from adding and dropping values stays at rounding level.
+    """
+    n = x.shape[0]
+    out = np.full(n, np.nan)
+    total = 0.0
+    comp = 0.0
+    for i in range(n):
+        y = x[i] - comp
+        t = total + y
+        comp = (t - total) - y
+        total = t
+        if i >= length:
+            y = -x[i - length] - comp
+            t = total + y
+            comp = (t - total) - y
+            total = t
+        if i >= length - 1: out[i] = total / length
+    return out
+
+# ==============================================================================
+#  VECTORISED (NumPy)
+# ==============================================================================
+
+def first_pullback(stop, touch, end):
+    """
+    Walking back from end - 1 to the most recent bar where stop is set, True if no bar touched.
+    Vectorised form of the engines' "is this the first pullback since the cross" loop.
+    """
+    stops = np.flatnonzero(stop[:end])
+    start = stops[-1] + 1 if stops.size else 0
+    return not touch[start:end].any()
+
+# ==============================================================================
+#  WARM-UP
+# ==============================================================================
+
+def warmup():
+    """
+    Compiles every kernel (or loads it from the on-disk cache) for the argument types
+    the engines pass, so the first scan does not pay for JIT. A no-op without numba.
+    """
+    bars = np.random.default_rng(0).uniform(1.0, 2.0, (64, 5))
+    h, l, c = (np.ascontiguousarray(bars[:, i]) for i in (1, 2, 3))
+    rsi_last(c, 14)
+    rsi_last(bars[:, 3], 14)  # strided column view, as strategy_engine passes it
+    macd_full(c, 12, 26, 9)
+    sma(c, 50)
+    supertrend_dir(h, l, c, 10, 4.0)
+    adx(h, l, c, 14)
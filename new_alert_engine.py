@@ -1,13 +1,15 @@
 import os
 import asyncio
-import pandas as pd
-import pandas_ta as ta
+import operator
+import numpy as np
 import ccxt.async_support as ccxt
 import logging
 import aiohttp
 from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
 from dotenv import load_dotenv
+from database_manager import supabase
+
+import indicators
 
 load_dotenv()
 
@@ -16,12 +18,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 logger = logging.getLogger("SignalEngine")
 
 # --- CONFIGURATION ---
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # --- EXCHANGE CONFIG ---
 exchange = ccxt.binance({
     'enableRateLimit': True,
@@ -32,34 +30,133 @@ exchange = ccxt.binance({
 })
 exchange.urls['api']['public'] = 'https://data-api.binance.vision/api/v3'
 
+# --- MACD STATE ---
+MACD_FAST, MACD_SLOW, MACD_SIGNAL = 12, 26, 9
+# EMA smoothing factors, alpha = 2 / (period + 1), fixed for the process
+ALPHA_FAST, ALPHA_SLOW, ALPHA_SIGNAL = (2 / (p + 1) for p in (MACD_FAST, MACD_SLOW, MACD_SIGNAL))
+
+# (symbol, timeframe) -> (last_ts, ema_fast, ema_slow, signal, prev_macd, prev_signal)
+# Lets each scan advance the EMAs by the newly closed bars instead of all 300.
+MACD_STATE = {}
+
+# (asset, timeframe, signal_type) -> detected_at already upserted; a scan that sees the
+# same closed candle again (e.g. hourly scans of a 4h/1d candle) skips those rows.
+SAVED_SCANS = {}
+
+# --- ALERT TYPES ---
+# Price alert type -> (trigger test against the target, message emoji)
+PRICE_RULES = {
+    'PRICE_TARGET_ABOVE': (operator.ge, "📈"),
+    'PRICE_TARGET_BELOW': (operator.le, "📉"),
+    'PRICE_TARGET': (operator.ge, "📉"),
+}
+# Signal types whose display name is not just the type with spaces
+SIGNAL_NAMES = {
+    'GOLDEN_CROSS': "GOLDEN CROSS (PULLBACK ENTRY)",
+    'DEATH_CROSS': "DEATH CROSS (PULLBACK ENTRY)",
+}
+
+# fetch_chat_ids sends at most this many user ids per in.(...) filter, so the GET URL stays short
+CHAT_ID_PAGE = 100
+
+# --- TELEGRAM ---
+# Caps in-flight sends so a burst of triggers does not flood Telegram (~30 msg/s per bot)
+TG_SEM = asyncio.Semaphore(25)
+TG_SEND_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+
+# send_telegram_message outcomes: rejections (blocked bot, unknown chat) consume the alert,
+# rate limits, server and network errors leave it for the next cycle
+TG_SENT, TG_REJECTED, TG_RETRY = "sent", "rejected", "retry"
+
+# One keep-alive session for every Telegram send, created lazily inside the event loop
+tg_session = None
+
+def get_tg_session():
+    global tg_session
+    if tg_session is None or tg_session.closed:
+        tg_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, ttl_dns_cache=300, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return tg_session
+
 # --- HELPER FUNCTIONS ---
 
 async def send_telegram_message(chat_id, message):
-    """Sends a message to the user via Telegram."""
+    """
+    Sends a message to the user via Telegram.
+    Returns TG_SENT, TG_REJECTED (permanent 4xx) or TG_RETRY (429, 5xx, network).
+    """
     if not chat_id or not BOT_TOKEN:
         logger.error("❌ Missing Chat ID or Bot Token")
-        return
+        return TG_RETRY if chat_id else TG_REJECTED
     
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    async with aiohttp.ClientSession() as session:
-        payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
+    payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
+    async with TG_SEM:
         try:
-            async with session.post(url, json=payload) as resp:
+            async with get_tg_session().post(TG_SEND_URL, json=payload) as resp:
                 if resp.status != 200:
-                    logger.error(f"Failed to send TG message: {await resp.text()}")
-                else:
-                    logger.info(f"✅ Message sent to {chat_id}")
+                    logger.error("Failed to send TG message (%s): %s", resp.status, await resp.text())
+                    return TG_REJECTED if 400 <= resp.status < 500 and resp.status != 429 else TG_RETRY
+                logger.debug("✅ Message sent to %s", chat_id)
+                return TG_SENT
         except Exception as e:
-            logger.error(f"Telegram Error: {e}")
+            logger.error("Telegram Error: %s", e)
+            return TG_RETRY
+
+def iso_to_ts(value):
+    """Epoch seconds for a Postgres timestamp string (naive values are UTC), or None."""
+    if not value: return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError: return None
+    if dt.tzinfo is None: dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
 
 async def get_live_price(symbol):
     try:
         ticker = await exchange.fetch_ticker(symbol)
         return ticker['last']
     except Exception as e:
-        logger.error(f"Error fetching price for {symbol}: {e}")
+        logger.error("Error fetching price for %s: %s", symbol, e)
         return None
 
+async def get_live_prices(symbols):
+    """Last prices for many symbols from one fetch_tickers request; falls back to per-symbol lookups if the batch fails."""
+    if not symbols: return {}
+    try:
+        tickers = await exchange.fetch_tickers(symbols)
+        return {sym: t['last'] for sym, t in tickers.items()}
+    except Exception as e:
+        logger.warning("Batch price fetch failed, falling back per symbol: %s", e)
+        prices = await asyncio.gather(*(get_live_price(sym) for sym in symbols))
+        return dict(zip(symbols, prices))
+
+def update_macd(symbol, timeframe, ts, close, curr_idx):
+    """Returns (macd, signal, prev_macd, prev_signal) at curr_idx, advancing the cached
+    EMA state by only the bars closed since the last scan. Falls back to a full pass
+    on the first scan or when the cached bar is no longer in the window."""
+    key = (symbol, timeframe)
+    state = MACD_STATE.get(key)
+    start = None
+    if state:
+        start = int(np.searchsorted(ts, state[0]))
+        if start > curr_idx or ts[start] != state[0]: start = None
+
+    if start is None:
+        ema_f, ema_s, sig, prev_macd, prev_sig = indicators.macd_full(
+            close[:curr_idx + 1], MACD_FAST, MACD_SLOW, MACD_SIGNAL)
+    else:
+        _, ema_f, ema_s, sig, prev_macd, prev_sig = state
+        for x in close[start + 1:curr_idx + 1]:
+            prev_macd, prev_sig = ema_f - ema_s, sig
+            ema_f += ALPHA_FAST * (x - ema_f)
+            ema_s += ALPHA_SLOW * (x - ema_s)
+            sig += ALPHA_SIGNAL * ((ema_f - ema_s) - sig)
+
+    MACD_STATE[key] = (ts[curr_idx], ema_f, ema_s, sig, prev_macd, prev_sig)
+    return ema_f - ema_s, sig, prev_macd, prev_sig
+
 # --- CORE LOGIC 1: TECHNICAL ANALYSIS ---
 
 async def analyze_asset(symbol, timeframe):
@@ -70,217 +167,231 @@ async def analyze_asset(symbol, timeframe):
         if not bars or len(bars) < 250: 
             return
         
-        df = pd.DataFrame(bars, columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
-        df[['open', 'high', 'low', 'close', 'vol']] = df[['open', 'high', 'low', 'close', 'vol']].apply(pd.to_numeric)
+        # One contiguous float64 array per column (no DataFrame); the checks read plain scalars from these
+        ts, o, h, l, c, v = np.ascontiguousarray(np.asarray(bars, dtype=np.float64).T)
         
-        # Timestamp
-        last_closed_row = df.iloc[-2]
-        last_closed_ts = datetime.fromtimestamp(last_closed_row['ts'] / 1000, tz=timezone.utc)
+        # Analyze the LAST CLOSED candle (index -2)
+        curr_idx = len(c) - 2
+        last_closed_ts = datetime.fromtimestamp(ts[curr_idx] / 1000, tz=timezone.utc)
         asset_name = symbol.replace('/USDT', '')
 
-        # Indicators
-        df.ta.rsi(length=14, append=True)
-        df.ta.sma(length=50, append=True)
-        df.ta.sma(length=200, append=True)
-        df.ta.macd(fast=12, slow=26, signal=9, append=True)
-        df.ta.bbands(length=20, std=2, append=True)
+        # Indicators (same values as pandas_ta)
+        # SMAs (50, 200): full series, the pullback checks walk back through them
+        sma50 = indicators.sma(c, 50)
+        sma200 = indicators.sma(c, 200)
+        # RSI (14) and Bollinger Bands (20, 2) are only read on the last closed candle
+        rsi = indicators.rsi_last(c[:curr_idx + 1], 14)
+        bb_win = c[curr_idx - 19:curr_idx + 1]
+        bb_mid, bb_dev = bb_win.mean(), 2 * bb_win.std()
+        bbu, bbl = bb_mid + bb_dev, bb_mid - bb_dev
+
+        macd, macd_sig, prev_macd, prev_sig = update_macd(symbol, timeframe, ts, c, curr_idx)
+        # Bull cross = MACD-minus-signal flips from <= 0 to > 0 across the last two bars
+        macd_bull_cross = (prev_macd - prev_sig) <= 0 < (macd - macd_sig)
         
-        def get_col(prefix):
-            match = [c for c in df.columns if c.startswith(prefix)]
-            return match[0] if match else None
-
-        cols = {
-            'rsi': get_col('RSI_14'),
-            'sma50': get_col('SMA_50'),
-            'sma200': get_col('SMA_200'),
-            'macd': get_col('MACD_12_26_9'),
-            'macds': get_col('MACDs_12_26_9'),
-            'bbu': get_col('BBU_20'), 
-            'bbl': get_col('BBL_20')
-        }
-
-        if None in cols.values(): return
-        
-        # Analyze the LAST CLOSED candle (index -2)
-        curr_idx = len(df) - 2
-        last = df.iloc[curr_idx]
-        prev = df.iloc[curr_idx - 1]
-        
-        avg_vol = df['vol'].rolling(20).mean().iloc[curr_idx]
-        vol_surge = last['vol'] > (avg_vol * 2.0)
+        # Only the 20-bar mean ending at curr_idx is read, so average that one window
+        avg_vol = v[curr_idx - 19:curr_idx + 1].mean()
+        vol_surge = v[curr_idx] > (avg_vol * 2.0)
+
+        last_open, last_high, last_low, last_close = o[curr_idx], h[curr_idx], l[curr_idx], c[curr_idx]
+        last_sma50, last_sma200 = sma50[curr_idx], sma200[curr_idx]
 
         findings = []
 
         # 1. GOLDEN CROSS PULLBACK
-        if last[cols['sma50']] > last[cols['sma200']]:
-            touched_ma = (last['low'] <= last[cols['sma50']]) or (last['low'] <= last[cols['sma200']])
-            is_green = last['close'] > last['open']
+        if last_sma50 > last_sma200:
+            touched_ma = (last_low <= last_sma50) or (last_low <= last_sma200)
+            is_green = last_close > last_open
             
             if touched_ma and is_green:
-                is_first_pullback = True
-                for i in range(curr_idx - 1, -1, -1):
-                    row = df.iloc[i]
-                    if row[cols['sma50']] <= row[cols['sma200']]: break
-                    
-                    if ((row['low'] <= row[cols['sma50']]) or (row['low'] <= row[cols['sma200']])) and (row['close'] > row['open']):
-                        is_first_pullback = False
-                        break
-                
-                if is_first_pullback: findings.append("GOLDEN_CROSS")
+                # No earlier green MA touch since the cross
+                if indicators.first_pullback(sma50 <= sma200, ((l <= sma50) | (l <= sma200)) & (c > o), curr_idx):
+                    findings.append("GOLDEN_CROSS")
 
         # 2. DEATH CROSS PULLBACK
-        if last[cols['sma50']] < last[cols['sma200']]:
-            touched_ma = (last['high'] >= last[cols['sma50']]) or (last['high'] >= last[cols['sma200']])
-            is_red = last['close'] < last['open']
+        if last_sma50 < last_sma200:
+            touched_ma = (last_high >= last_sma50) or (last_high >= last_sma200)
+            is_red = last_close < last_open
             
             if touched_ma and is_red:
-                is_first_pullback = True
-                for i in range(curr_idx - 1, -1, -1):
-                    row = df.iloc[i]
-                    if row[cols['sma50']] >= row[cols['sma200']]: break
-                    
-                    if ((row['high'] >= row[cols['sma50']]) or (row['high'] >= row[cols['sma200']])) and (row['close'] < row['open']):
-                        is_first_pullback = False
-                        break
-                
-                if is_first_pullback: findings.append("DEATH_CROSS")
+                # No earlier red MA touch since the cross
+                if indicators.first_pullback(sma50 >= sma200, ((h >= sma50) | (h >= sma200)) & (c < o), curr_idx):
+                    findings.append("DEATH_CROSS")
 
         # 3. OTHER SIGNALS
-        if last[cols['macd']] > last[cols['macds']] and prev[cols['macd']] <= prev[cols['macds']]:
+        if macd_bull_cross:
             findings.append("MACD_BULL_CROSS")
         
-        if last[cols['rsi']] < 35 and last['low'] <= last[cols['bbl']] and vol_surge:
+        if rsi < 35 and last_low <= bbl and vol_surge:
             findings.append("SNIPER_BUY_REVERSAL")
             
-        if last[cols['rsi']] > 65 and last['high'] >= last[cols['bbu']] and vol_surge:
+        if rsi > 65 and last_high >= bbu and vol_surge:
             findings.append("SNIPER_SELL_REJECTION")
             
-        if last[cols['macd']] > last[cols['macds']] and prev[cols['macd']] <= prev[cols['macds']] and vol_surge:
+        if macd_bull_cross and vol_surge:
              findings.append("MOMENTUM_BREAKOUT")
 
         # --- SAVE TO DB ---
+        # All of this candle's findings in one upsert request
+        detected_at = last_closed_ts.isoformat()
+        findings = [s for s in findings if SAVED_SCANS.get((asset_name, timeframe, s)) != detected_at]
         if findings:
+            rows = [{"asset": asset_name, "timeframe": timeframe, "signal_type": signal, "detected_at": detected_at}
+                    for signal in findings]
+            await asyncio.to_thread(supabase.table('market_scans').upsert(rows, on_conflict="asset,timeframe,signal_type").execute)
             for signal in findings:
-                data = {
-                    "asset": asset_name,
-                    "timeframe": timeframe,
-                    "signal_type": signal,
-                    "detected_at": last_closed_ts.isoformat()
-                }
-                supabase.table('market_scans').upsert(data, on_conflict="asset,timeframe,signal_type").execute()
-                logger.info(f"✅ Signal Saved: {asset_name} | {timeframe} | {signal}")
+                SAVED_SCANS[(asset_name, timeframe, signal)] = detected_at
+                logger.info("✅ Signal Saved: %s | %s | %s", asset_name, timeframe, signal)
 
     except Exception as e:
-        logger.error(f"Error analyzing {symbol}: {e}")
+        logger.error("Error analyzing %s: %s", symbol, e)
 
 # --- CORE LOGIC 2: ALERT CHECKER ---
 
+def fetch_recent_scans(tech_alerts, lookback_time):
+    """
+    Loads the market_scans since lookback_time for the given technical alerts in one request.
+    Returns (asset, timeframe, signal_type) -> newest detected_at string.
+    """
+    if not tech_alerts: return {}
+    try:
+        res = supabase.table('market_scans').select('asset,timeframe,signal_type,detected_at')\
+            .in_('asset', list({a['asset'].replace('/USDT', '') for a in tech_alerts}))\
+            .in_('timeframe', list({a['timeframe'] for a in tech_alerts}))\
+            .in_('signal_type', list({a['alert_type'] for a in tech_alerts}))\
+            .gte('detected_at', lookback_time)\
+            .order('detected_at')\
+            .execute()
+    except Exception as e:
+        logger.error("Error checking signals: %s", e)
+        return {}
+
+    # Ascending order, so the newest row for each key is written last
+    return {(r['asset'], r['timeframe'], r['signal_type']): r['detected_at'] for r in res.data}
+
+def fetch_chat_ids(user_ids):
+    """Maps user_uuid -> telegram_chat_id for the given users (linked users only), CHAT_ID_PAGE ids per request."""
+    chat_ids = {}
+    for i in range(0, len(user_ids), CHAT_ID_PAGE):
+        # A failed page only loses its own users
+        try:
+            res = supabase.table('users').select('user_uuid,telegram_chat_id')\
+                .in_('user_uuid', user_ids[i:i + CHAT_ID_PAGE]).not_.is_('telegram_chat_id', 'null').execute()
+            chat_ids.update((r['user_uuid'], r['telegram_chat_id']) for r in res.data if r.get('telegram_chat_id'))
+        except Exception as e:
+            logger.error("Chat ID Error: %s", e)
+    return chat_ids
+
 async def check_alerts():
     """Checks for Price Targets and Database Signals."""
     
     try:
-        response = supabase.table('alerts').select("*").execute()
+        response = await asyncio.to_thread(supabase.table('alerts').select("*").execute)
         alerts = response.data
     except Exception as e:
-        logger.error(f"DB Error: {e}")
+        logger.error("DB Error: %s", e)
         return
 
     if not alerts: return
 
+    # One clock read per cycle; the per-alert checks compare epoch seconds against these
+    now = datetime.now(timezone.utc)
+    # Shared by every price alert fired this cycle so their updates batch together
+    cycle_ts = now.isoformat()
+    cooldown_ts = now.timestamp() - 3600
+    lookback_time = (now - timedelta(hours=24)).isoformat()
+    outbox = []        # (alert, trigger_timestamp, chat_id, message) to send this cycle
+
+    # 1. Telegram IDs for every alert owner and the recent scans for every technical alert, one query each,
+    # alongside one ticker request for every price alert's asset
+    tech_alerts = [a for a in alerts if 'PRICE_TARGET' not in a['alert_type']]
+    price_assets = list({a['asset'] for a in alerts if 'PRICE_TARGET' in a['alert_type']})
+    chat_ids, recent_scans, live_prices = await asyncio.gather(
+        asyncio.to_thread(fetch_chat_ids, list({a['user_id'] for a in alerts})),
+        asyncio.to_thread(fetch_recent_scans, tech_alerts, lookback_time),
+        get_live_prices(price_assets))
+
     for alert in alerts:
         user_uuid = alert['user_id']
         asset = alert['asset']
         alert_type = alert['alert_type']
         is_recurring = alert.get('is_recurring', False)
-        last_triggered = alert.get('last_triggered_at')
+        last_triggered = iso_to_ts(alert.get('last_triggered_at'))
 
-        # 1. Look up Telegram ID
-        try:
-            user_res = supabase.table('users').select('telegram_chat_id').eq('user_uuid', user_uuid).execute()
-            if not user_res.data or not user_res.data[0].get('telegram_chat_id'):
-                continue
-            chat_id = user_res.data[0]['telegram_chat_id']
-        except Exception as e:
-            logger.error(f"Chat ID Error: {e}")
-            continue
+        chat_id = chat_ids.get(user_uuid)
+        if not chat_id: continue
 
         should_trigger = False
         trigger_msg = ""
-        trigger_timestamp = datetime.now(timezone.utc).isoformat()
+        trigger_timestamp = cycle_ts
 
         # --- A. PRICE ALERTS ---
         if 'PRICE_TARGET' in alert_type:
             # Check recurring cooldown
-            if is_recurring and last_triggered:
-                try:
-                    last_time = datetime.fromisoformat(last_triggered)
-                    if (datetime.now(timezone.utc) - last_time).total_seconds() < 3600:
-                        continue 
-                except: pass
+            if is_recurring and last_triggered and last_triggered > cooldown_ts:
+                continue
 
             # FIX: Safely handle None target price
             raw_target = alert.get('target_price')
             if raw_target is None: continue 
             
             target_price = float(raw_target)
-            current_price = await get_live_price(asset)
+            current_price = live_prices.get(asset)
+            rule = PRICE_RULES.get(alert_type)
             
-            if current_price:
-                if (alert_type == 'PRICE_TARGET_ABOVE' and current_price >= target_price) or \
-                   (alert_type == 'PRICE_TARGET_BELOW' and current_price <= target_price) or \
-                   (alert_type == 'PRICE_TARGET' and current_price >= target_price):
-                    
-                    emoji = "📈" if "ABOVE" in alert_type else "📉"
+            if current_price and rule:
+                reached, emoji = rule
+                if reached(current_price, target_price):
                     trigger_msg = f"{emoji} <b>PRICE ALERT:</b>\n#{asset} reached <b>${current_price}</b>\n(Target: ${target_price})"
                     should_trigger = True
         
         # --- B. TECHNICAL ALERTS ---
         else:
-            lookback_time = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-            search_asset = asset.replace('/USDT', '') 
-            
-            try:
-                scan_res = supabase.table('market_scans')\
-                    .select("*")\
-                    .eq('asset', search_asset)\
-                    .eq('timeframe', alert['timeframe'])\
-                    .eq('signal_type', alert_type)\
-                    .gte('detected_at', lookback_time)\
-                    .order('detected_at', desc=True)\
-                    .execute()
-                
-                if scan_res.data:
-                    newest_signal = scan_res.data[0]
-                    signal_time = datetime.fromisoformat(newest_signal['detected_at'])
-                    trigger_timestamp = newest_signal['detected_at']
-
-                    if is_recurring and last_triggered:
-                        try:
-                            last_alert_time = datetime.fromisoformat(last_triggered)
-                            if signal_time <= last_alert_time:
-                                continue
-                        except: pass
-
-                    signal_display = alert_type.replace('_', ' ')
-                    if alert_type == "GOLDEN_CROSS": signal_display = "GOLDEN CROSS (PULLBACK ENTRY)"
-                    elif alert_type == "DEATH_CROSS": signal_display = "DEATH CROSS (PULLBACK ENTRY)"
-
-                    trigger_msg = f"🚀 <b>SIGNAL ALERT:</b>\n#{asset} ({alert['timeframe']})\n<b>{signal_display}</b> detected!"
-                    should_trigger = True
-            except Exception as e:
-                logger.error(f"Error checking signals: {e}")
+            newest_signal = recent_scans.get((asset.replace('/USDT', ''), alert['timeframe'], alert_type))
+            if newest_signal:
+                signal_time = iso_to_ts(newest_signal)
+                trigger_timestamp = newest_signal
+
+                if is_recurring and last_triggered:
+                    if signal_time is None or signal_time <= last_triggered:
+                        continue
+
+                signal_display = SIGNAL_NAMES.get(alert_type) or alert_type.replace('_', ' ')
+
+                trigger_msg = f"🚀 <b>SIGNAL ALERT:</b>\n#{asset} ({alert['timeframe']})\n<b>{signal_display}</b> detected!"
+                should_trigger = True
 
-        # --- EXECUTE TRIGGER ---
         if should_trigger:
-            await send_telegram_message(chat_id, trigger_msg)
-            
-            if is_recurring:
-                supabase.table('alerts').update({'last_triggered_at': trigger_timestamp}).eq('id', alert['id']).execute()
-                logger.info(f"🔄 Recurring Alert Updated: {asset} {alert_type}")
-            else:
-                supabase.table('alerts').delete().eq('id', alert['id']).execute()
-                logger.info(f"🗑️ One-Time Alert Deleted: {asset} {alert_type}")
+            outbox.append((alert, trigger_timestamp, chat_id, trigger_msg))
+
+    # --- EXECUTE TRIGGERS ---
+    # Send concurrently; delivered and rejected alerts are re-armed or deleted, transient failures retry next cycle
+    sent = await asyncio.gather(*(send_telegram_message(chat_id, msg) for _, _, chat_id, msg in outbox))
+    expired_ids = []   # One-time alerts to delete
+    rearmed = {}       # last_triggered_at -> recurring alert ids
+    for (alert, trigger_timestamp, _, _), outcome in zip(outbox, sent):
+        if outcome == TG_RETRY: continue
+        if alert.get('is_recurring', False):
+            rearmed.setdefault(trigger_timestamp, []).append(alert['id'])
+        else:
+            expired_ids.append(alert['id'])
+
+    await asyncio.to_thread(flush_alert_updates, expired_ids, rearmed)
+
+def flush_alert_updates(expired_ids, rearmed):
+    """Applies a cycle's alert bookkeeping: one delete, plus one update per distinct timestamp."""
+    try:
+        if expired_ids:
+            supabase.table('alerts').delete().in_('id', expired_ids).execute()
+            logger.debug("🗑️ One-Time Alerts Deleted: %d", len(expired_ids))
+        for trigger_timestamp, ids in rearmed.items():
+            supabase.table('alerts').update({'last_triggered_at': trigger_timestamp}).in_('id', ids).execute()
+            logger.debug("🔄 Recurring Alerts Updated: %d", len(ids))
+    except Exception as e:
+        logger.error("Alert Update Error: %s", e)
 
 async def close_exchange():
     if exchange:
-        await exchange.close()
\ No newline at end of file
+        await exchange.close()
+    if tg_session:
+        await tg_session.close()
\ No newline at end of file
@@ -2,15 +2,17 @@ import asyncio
 import logging
 import os
 import gc
-from datetime import datetime, timedelta
+import time
+import uuid
 from telegram import Update
 from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes
-from supabase import create_client, Client
 from dotenv import load_dotenv
 
 # --- IMPORTS ---
 # We now only use signal_engine (which contains ALL strategies)
 import signal_engine  
+import indicators
+from database_manager import supabase
 
 load_dotenv()
 
@@ -18,15 +20,18 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("Worker")
 
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 
-if not all([SUPABASE_URL, SUPABASE_KEY, TELEGRAM_BOT_TOKEN]):
+# Supabase config is checked by database_manager on import
+if not TELEGRAM_BOT_TOKEN:
     logger.critical("❌ Missing Secrets! Check .env file.")
     exit(1)
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+# The worker reads every user's alerts and uses link_telegram_user and pending_signal_alerts,
+# which are revoked from anon and authenticated: the anon key is not enough here
+if not os.environ.get("SUPABASE_SERVICE_ROLE_KEY"):
+    logger.critical("❌ Missing SUPABASE_SERVICE_ROLE_KEY! The worker needs the service role key.")
+    exit(1)
 
 # Symbols to scan
 SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT', 'BNB/USDT', 'DOGE/USDT', 'AVAX/USDT', 'LINK/USDT', 'MATIC/USDT'] 
@@ -34,6 +39,10 @@ SYMBOLS = ['BTC/USDT', 'ETH/USDT', 'SOL/USDT', 'XRP/USDT', 'ADA/USDT', 'BNB/USDT
 # Timeframes to scan (Updated to 1h, 4h, 1d)
 TIMEFRAMES = ['1h', '4h', '1d'] 
 
+# Concurrent analyze_asset calls per scan cycle; candle fetches also share signal_engine's
+# exchange semaphore with the alert checker, and ccxt's rate limiter still paces the requests
+SCAN_CONCURRENCY = 20
+
 # ==========================================================
 # 1. TELEGRAM HANDSHAKE (/start user_id)
 # ==========================================================
@@ -42,10 +51,17 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     chat_id = update.effective_chat.id
     if context.args:
         user_uuid = context.args[0]
+        # Reject malformed ids before they cost a database round trip
         try:
-            # Update user profile with chat_id
-            response = supabase.table('users').update({'telegram_chat_id': str(chat_id)})\
-                .eq('user_uuid', user_uuid).execute()
+            user_uuid = str(uuid.UUID(user_uuid))
+        except ValueError:
+            await update.message.reply_text("❌ Invalid link code. Use the 'Link Telegram Bot' button on your Dashboard.")
+            return
+        try:
+            # Update user profile with chat_id (in a worker thread: supabase-py blocks)
+            # link_telegram_user is a plan-cached SQL function; it returns whether the user exists
+            query = supabase.rpc('link_telegram_user', {'p_user_uuid': user_uuid, 'p_chat_id': str(chat_id)})
+            response = await asyncio.to_thread(query.execute)
             
             if response.data:
                 await update.message.reply_text("✅ *Linked!* You will now receive alerts here.", parse_mode='Markdown')
@@ -64,8 +80,11 @@ async def start_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 async def alert_loop():
     """Watches for Price Targets (Live) and DB Signals (Delayed)."""
     logger.info("👀 Alert Watcher Started (60s cycle)...")
+    loop = asyncio.get_running_loop()
     
     while True:
+        # Monotonic clock: immune to wall-clock jumps
+        start_time = loop.time()
         try:
             # Call the signal engine to check alerts
             await signal_engine.check_alerts()
@@ -73,48 +92,52 @@ async def alert_loop():
         except Exception as e:
             logger.error(f"Alert Loop Error: {e}")
             
-        # Run every 60 seconds to catch Price Targets quickly
-        await asyncio.sleep(60)
+        # Run every 60 seconds to catch Price Targets quickly (minus the time the check took)
+        await asyncio.sleep(max(0, 60 - (loop.time() - start_time)))
 
 # ==========================================================
 # 3. MARKET SCANNER (Runs Every HOUR at XX:00)
 # ==========================================================
+async def scan_one(sem, symbol, tf):
+    async with sem:
+        try:
+            # Calls engine logic to calculate indicators; returns the rows to save
+            # This now includes ALL logic (Supertrend, Unlock, etc.)
+            return await signal_engine.analyze_asset(symbol, tf)
+        except Exception as e:
+            logger.error("Scan Error %s: %s", symbol, e)
+            return []
+
 async def scanner_loop():
     """Scans market data aligned to Hourly candles."""
     logger.info("📉 Hourly Market Scanner Started...")
+    sem = asyncio.Semaphore(SCAN_CONCURRENCY)
     
     while True:
         try:
             # 1. Calculate wait time for next Hour (XX:00)
-            now = datetime.now()
-            # Calculate minutes until the next hour
-            minutes_to_next = 60 - now.minute
-            next_mark = now.replace(second=0, microsecond=0) + timedelta(minutes=minutes_to_next)
+            # Plain epoch arithmetic: candles close on UTC hour boundaries, so no DST edge cases
+            into_hour = time.time() % 3600
             
             # If we are slightly past the hour (e.g., 09:00:05), it handles it correctly
-            if now.minute == 0 and now.second < 10:
+            if into_hour < 10:
                 # We are at the top of the hour, run immediately!
                 wait_time = 0
             else:
-                wait_time = (next_mark - now).total_seconds()
+                wait_time = 3600 - into_hour
 
             if wait_time > 5:
-                logger.info(f"Scanner sleeping {int(wait_time)}s until next Hour ({next_mark.strftime('%H:%M')})...")
+                logger.info(f"Scanner sleeping {int(wait_time)}s until next Hour...")
                 await asyncio.sleep(wait_time)
                 # Small buffer to ensure exchange has processed the candle close
                 await asyncio.sleep(5) 
             
             # 2. Run Technical Analysis Scan (Supertrend / Crosses / Unlock / Trend)
             logger.info("--- Starting Hourly Scan Cycle ---")
-            for symbol in SYMBOLS:
-                for tf in TIMEFRAMES:
-                    try:
-                        # Calls engine logic to calculate indicators & save to DB
-                        # This now includes ALL logic (Supertrend, Unlock, etc.)
-                        await signal_engine.analyze_asset(symbol, tf)
-                        await asyncio.sleep(0.5) # Rate limit protection
-                    except Exception as e:
-                        logger.error(f"Scan Error {symbol}: {e}")
+            signal_engine.ohlcv_cache.evict_stale()
+            results = await asyncio.gather(*(scan_one(sem, symbol, tf) for symbol in SYMBOLS for tf in TIMEFRAMES))
+            # One upsert for the whole cycle instead of one per finding
+            await signal_engine.save_scans([row for rows in results for row in rows])
             
             logger.info("--- Scan Cycle Complete ---")
             
@@ -129,6 +152,9 @@ async def scanner_loop():
 # 4. MAIN ENTRY POINT
 # ==========================================================
 async def main():
+    # Compile the indicator kernels before the first scan needs them
+    indicators.warmup()
+
     # Setup Telegram Bot Listener
     application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
     application.add_handler(CommandHandler("start", start_command))
@@ -138,6 +164,9 @@ async def main():
     await application.updater.start_polling()
     logger.info("✅ Telegram Bot Listener Active.")
 
+    # One pooled exchange session shared by the scanner and the alert checker
+    await signal_engine.open_exchange()
+
     # Run Scanner and Alerter Concurrently
     try:
         await asyncio.gather(
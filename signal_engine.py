@@ -1,13 +1,19 @@
 import os
+import ssl
+import time
 import asyncio
-import pandas as pd
-import pandas_ta as ta
+import certifi
+import numpy as np
 import ccxt.async_support as ccxt
 import logging
 import aiohttp
+from collections import namedtuple
+from functools import lru_cache
 from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
 from dotenv import load_dotenv
+from database_manager import supabase
+
+import indicators
 
 load_dotenv()
 
@@ -16,12 +22,8 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger("SignalEngine")
 
 # --- CONFIGURATION ---
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
 BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
 
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
 # --- EXCHANGE CONFIG ---
 exchange = ccxt.binance({
     'enableRateLimit': True,
@@ -32,6 +34,79 @@ exchange = ccxt.binance({
 })
 exchange.urls['api']['public'] = 'https://data-api.binance.vision/api/v3'
 
+async def open_exchange():
+    """Gives the shared exchange a tuned connection pool. Must run inside the event loop."""
+    if exchange.session is None:
+        connector = aiohttp.TCPConnector(
+            ssl=ssl.create_default_context(cafile=certifi.where()),
+            limit=200, limit_per_host=50, ttl_dns_cache=300, enable_cleanup_closed=True,
+            # Outlives the 60s alert cycle, so each check reuses the previous cycle's TLS connections
+            keepalive_timeout=75
+        )
+        # ccxt still owns the session, so close_exchange() closes it too
+        exchange.session = aiohttp.ClientSession(connector=connector)
+
+# --- OHLCV CACHE ---
+# Timeframe string -> candle length in seconds, parsed once per timeframe
+TF_SECONDS = {}
+
+class OHLCVCache:
+    """
+    Keeps fetched candles per (symbol, timeframe), as one float64 array, until the running candle closes.
+    After that only the bars from the cached tail onwards are fetched and spliced on.
+    """
+    def __init__(self):
+        self._d = {}
+        self._locks = {}
+
+    async def get_or_fetch(self, symbol, timeframe, limit=300):
+        key = (symbol, timeframe)
+        # Per-key lock so concurrent callers share one request instead of racing
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            now = time.time()
+            cached = self._d.get(key)
+            if cached and cached[0] > now:
+                return cached[1]
+
+            tf_seconds = TF_SECONDS.get(timeframe) or TF_SECONDS.setdefault(timeframe, exchange.parse_timeframe(timeframe))
+            old = cached[1] if cached and len(cached[1]) >= limit else None
+            # Candles opened since the cached tail, which was still running when it was cached
+            missing = int((now - old[-1, 0] / 1000) // tf_seconds) + 1 if old is not None else limit
+
+            bars = None
+            if missing < limit:
+                async with EXCHANGE_SEM:
+                    tail = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=int(old[-1, 0]), limit=missing + 1)
+                # An empty tail falls through to a full fetch rather than skipping the pair this cycle
+                if tail:
+                    tail = np.asarray(tail, dtype=np.float64)
+                    bars = np.concatenate((old[old[:, 0] < tail[0, 0]], tail))[-limit:]
+            if bars is None:
+                async with EXCHANGE_SEM:
+                    bars = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
+                if not bars: return None
+                # Converted once here, so cache hits skip the list -> array pass
+                bars = np.asarray(bars, dtype=np.float64)
+
+            # Expire on the next candle boundary: nothing new closes before then
+            expires_at = (now // tf_seconds + 1) * tf_seconds
+            self._d[key] = (expires_at, bars)
+            return bars
+
+    def evict_stale(self):
+        """Drops entries too far behind to extend with a tail fetch; call once per scan cycle."""
+        now = time.time()
+        for key, (_, bars) in list(self._d.items()):
+            tf_seconds = TF_SECONDS[key[1]]
+            if (now - bars[-1, 0] / 1000) // tf_seconds + 1 >= len(bars):
+                del self._d[key]
+
+ohlcv_cache = OHLCVCache()
+
+# Caps in-flight exchange requests so bursts queue here instead of inside ccxt's throttler
+EXCHANGE_SEM = asyncio.Semaphore(20)
+
 # --- STRATEGY SETTINGS ---
 # 1. Supertrend
 ST_PERIOD = 10
@@ -51,22 +126,93 @@ DAYS_BEFORE_UNLOCK = 7
 #  HELPER FUNCTIONS
 # ==============================================================================
 
+# --- RATE LIMITING ---
+class RateLimiter:
+    """Token bucket: bursts of up to `rate` calls go straight through, then calls are paced to `rate` per `per` seconds."""
+    def __init__(self, rate, per=1.0):
+        self.rate = rate
+        self.per = per
+        self._tokens = rate
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        # Waiters queue on the lock, so tokens are handed out in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.rate, self._tokens + (now - self._updated) * self.rate / self.per)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.per / self.rate)
+
+    async def __aexit__(self, *exc):
+        pass
+
+# Telegram allows ~30 messages/sec per bot
+TG_LIMIT = RateLimiter(30)
+
+TG_SEND_URL = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
+
+# send_telegram_message outcomes. A rejection (blocked bot, unknown chat) is final, so the alert
+# is consumed like a delivered one; only rate limits, server and network errors retry next cycle.
+TG_SENT, TG_REJECTED, TG_RETRY = "sent", "rejected", "retry"
+
+# One keep-alive session for every Telegram send, created lazily inside the event loop
+tg_session = None
+
+def get_tg_session():
+    global tg_session
+    if tg_session is None or tg_session.closed:
+        tg_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=50, keepalive_timeout=75),
+            timeout=aiohttp.ClientTimeout(total=10)
+        )
+    return tg_session
+
 async def send_telegram_message(chat_id, message):
-    if not chat_id or not BOT_TOKEN: return
-    url = f"https://api.telegram.org/bot{BOT_TOKEN}/sendMessage"
-    async with aiohttp.ClientSession() as session:
-        payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
+    """Returns TG_SENT, TG_REJECTED (permanent 4xx) or TG_RETRY (429, 5xx, network)."""
+    if not chat_id: return TG_REJECTED
+    if not BOT_TOKEN: return TG_RETRY
+    payload = {"chat_id": chat_id, "text": message, "parse_mode": "HTML"}
+    async with TG_LIMIT:
         try:
-            async with session.post(url, json=payload) as resp:
-                if resp.status != 200: logger.error(f"TG Error: {await resp.text()}")
-        except Exception as e: logger.error(f"Telegram Error: {e}")
+            async with get_tg_session().post(TG_SEND_URL, json=payload) as resp:
+                if resp.status == 200: return TG_SENT
+                logger.error("TG Error %s: %s", resp.status, await resp.text())
+                return TG_REJECTED if 400 <= resp.status < 500 and resp.status != 429 else TG_RETRY
+        except Exception as e:
+            logger.error("Telegram Error: %s", e)
+            return TG_RETRY
 
 async def get_live_price(symbol):
     try:
-        ticker = await exchange.fetch_ticker(symbol)
-        return ticker['last']
+        async with EXCHANGE_SEM:
+            await exchange.load_markets()
+            # /ticker/price carries only the last price, unlike the full 24h ticker stats
+            res = await exchange.publicGetTickerPrice({'symbol': exchange.market_id(symbol)})
+        return float(res['price'])
     except: return None
 
+async def get_live_prices(symbols):
+    """
+    Last prices for many symbols from a single /ticker/price request.
+    Binance rejects the whole batch if any symbol is unknown, so that case falls back to per-symbol lookups.
+    """
+    if not symbols: return {}
+    try:
+        async with EXCHANGE_SEM:
+            await exchange.load_markets()
+            ids = {exchange.market_id(sym): sym for sym in symbols}
+            res = await exchange.publicGetTickerPrice({'symbols': exchange.json(list(ids))})
+        return {ids[t['symbol']]: float(t['price']) for t in res}
+    except Exception as e:
+        logger.warning("Batch price fetch failed, falling back per symbol: %s", e)
+        prices = await asyncio.gather(*(get_live_price(sym) for sym in symbols))
+        return dict(zip(symbols, prices))
+
 def get_next_unlock_date(day):
     """Calculates the next occurrence of a specific day of the month."""
     now = datetime.now()
@@ -89,239 +235,294 @@ def get_next_unlock_date(day):
 
 async def analyze_asset(symbol, timeframe):
     """
-    Runs ALL strategies (Supertrend, Crosses, Unlock, Trend) and saves signals.
+    Fetches candles and runs ALL strategies (Supertrend, Crosses, Unlock, Trend) on them.
+    Returns the market_scans rows to save.
     """
     try:
         # 1. Fetch Data
         # limit=300 covers the 200 SMA requirement
-        bars = await exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=300)
-        if not bars or len(bars) < 250: return
-        
-        df = pd.DataFrame(bars, columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
-        df[['open', 'high', 'low', 'close', 'vol']] = df[['open', 'high', 'low', 'close', 'vol']].apply(pd.to_numeric)
-        
-        # Timestamp info
-        last_closed_row = df.iloc[-2]
-        last_closed_ts = datetime.fromtimestamp(last_closed_row['ts'] / 1000, tz=timezone.utc)
-        asset_name = symbol.replace('/USDT', '')
-
-        # --- 2. CALCULATE ALL INDICATORS ---
-        
-        # Supertrend (10, 4)
-        st = df.ta.supertrend(length=ST_PERIOD, multiplier=ST_FACTOR, append=True)
-        st_dir_col = [c for c in df.columns if c.startswith('SUPERTd_')][0] if st is not None else None
-
-        # ADX (14)
-        df.ta.adx(length=14, append=True)
-        adx_col = [c for c in df.columns if c.startswith('ADX_')][0]
-
-        # RSI (14)
-        df.ta.rsi(length=14, append=True)
-        
-        # SMAs (50, 200)
-        df.ta.sma(length=50, append=True)
-        df.ta.sma(length=200, append=True)
-        
-        # Bollinger Bands (20, 2)
-        df.ta.bbands(length=20, std=2, append=True)
-        
-        # Relative Volume (RVOL)
-        df['Vol_SMA'] = df['vol'].rolling(20).mean()
-        df['RVOL'] = df['vol'] / df['Vol_SMA']
-
-        # Column Helper
-        def get_col(prefix):
-            match = [c for c in df.columns if c.startswith(prefix)]
-            return match[0] if match else None
-
-        cols = {
-            'rsi': get_col('RSI_14'),
-            'sma50': get_col('SMA_50'),
-            'sma200': get_col('SMA_200'),
-            'bbu': get_col('BBU_20'),
-            'st_dir': st_dir_col,
-            'adx': adx_col
-        }
-        
-        if None in cols.values(): return
-
-        # --- 3. EVALUATE STRATEGIES (On Last Closed Candle) ---
-        curr_idx = len(df) - 2
-        last = df.iloc[curr_idx]
-        
-        findings = []
-
-        # -------------------------------------------------------
-        # STRATEGY A: SUPERTREND MOMENTUM (From Backtest)
-        # Logic: Supertrend=1 (Green) + ADX>20 + RVOL>1.5 + RSI<70
-        # -------------------------------------------------------
-        if (last[cols['st_dir']] == 1 and 
-            last[cols['adx']] > ADX_THRESHOLD and 
-            last['RVOL'] > RVOL_THRESHOLD and 
-            last[cols['rsi']] < RSI_MAX):
-            findings.append("SUPERTREND_BUY")
-
-        # -------------------------------------------------------
-        # STRATEGY B: CROSSOVER PULLBACKS
-        # -------------------------------------------------------
-        # Golden Cross Pullback
-        if last[cols['sma50']] > last[cols['sma200']]:
-            touched_ma = (last['low'] <= last[cols['sma50']]) or (last['low'] <= last[cols['sma200']])
-            is_green = last['close'] > last['open']
-            if touched_ma and is_green:
-                # Ensure it's a fresh pullback
-                is_fresh = True
-                for i in range(curr_idx - 1, -1, -1):
-                    row = df.iloc[i]
-                    if row[cols['sma50']] <= row[cols['sma200']]: break
-                    if ((row['low'] <= row[cols['sma50']]) or (row['low'] <= row[cols['sma200']])) and (row['close'] > row['open']):
-                        is_fresh = False; break
-                if is_fresh: findings.append("GOLDEN_CROSS")
-
-        # Death Cross Pullback
-        if last[cols['sma50']] < last[cols['sma200']]:
-            touched_ma = (last['high'] >= last[cols['sma50']]) or (last['high'] >= last[cols['sma200']])
-            is_red = last['close'] < last['open']
-            if touched_ma and is_red:
-                is_fresh = True
-                for i in range(curr_idx - 1, -1, -1):
-                    row = df.iloc[i]
-                    if row[cols['sma50']] >= row[cols['sma200']]: break
-                    if ((row['high'] >= row[cols['sma50']]) or (row['high'] >= row[cols['sma200']])) and (row['close'] < row['open']):
-                        is_fresh = False; break
-                if is_fresh: findings.append("DEATH_CROSS")
-
-        # -------------------------------------------------------
-        # STRATEGY C: 200MA TREND + RSI
-        # -------------------------------------------------------
-        # Bullish: Price > 200MA + RSI <= 35 + Green Candle
-        if (last['close'] > last[cols['sma200']]) and (last[cols['rsi']] <= 35) and (last['close'] > last['open']):
-            findings.append("STRATEGY_BULLISH_200MA_RSI")
-        
-        # Bearish: Price < 200MA + RSI >= 65 + Red Candle
-        if (last['close'] < last[cols['sma200']]) and (last[cols['rsi']] >= 65) and (last['close'] < last['open']):
-            findings.append("STRATEGY_BEARISH_200MA_RSI")
-
-        # -------------------------------------------------------
-        # STRATEGY D: TOKEN UNLOCK SHORT
-        # -------------------------------------------------------
-        if asset_name in UNLOCK_TOKENS:
-            unlock_day = UNLOCK_TOKENS[asset_name]
-            next_unlock = get_next_unlock_date(unlock_day)
-            window_start = next_unlock - timedelta(days=DAYS_BEFORE_UNLOCK)
-            now = datetime.now()
-
-            # Inside 7-day window?
-            if window_start <= now <= next_unlock:
-                # Logic: Touch Upper BB + Red Candle
-                touched_bb = last['high'] >= last[cols['bbu']]
-                is_red = last['close'] < last['open']
-                if touched_bb and is_red:
-                    findings.append("STRATEGY_UNLOCK_SHORT")
-
-        # --- 4. SAVE TO SUPABASE ---
-        if findings:
-            for signal in findings:
-                data = {
-                    "asset": asset_name,
-                    "timeframe": timeframe,
-                    "signal_type": signal,
-                    "detected_at": last_closed_ts.isoformat()
-                }
-                # Upsert to DB
-                supabase.table('market_scans').upsert(data, on_conflict="asset,timeframe,signal_type").execute()
-                logger.info(f"✅ Signal Saved: {asset_name} | {timeframe} | {signal}")
+        bars = await ohlcv_cache.get_or_fetch(symbol, timeframe, limit=300)
+        if bars is None or len(bars) < 250: return []
+
+        # The strategies are pure CPU work and the numba kernels release the GIL,
+        # so they run in a worker thread while the event loop keeps fetching other symbols
+        return await asyncio.to_thread(scan_bars, symbol, timeframe, bars)
 
     except Exception as e:
-        logger.error(f"Error analyzing {symbol}: {e}")
+        logger.error("Error analyzing %s: %s", symbol, e)
+        return []
+
+def scan_bars(symbol, timeframe, bars):
+    """Evaluates every strategy on one symbol's candles and returns the market_scans rows to save."""
+    # One contiguous float64 array per column (no DataFrame); the strategies read plain scalars from these
+    ts, o, h, l, c, v = np.ascontiguousarray(bars.T)
+    curr_idx = len(c) - 2
+    
+    # Timestamp info
+    last_closed_ts = datetime.fromtimestamp(ts[curr_idx] / 1000, tz=timezone.utc)
+    asset_name = symbol.replace('/USDT', '')
+
+    # --- 2. CALCULATE ALL INDICATORS ---
+    
+    # Supertrend (10, 4) and ADX (14): compiled recurrences, same values as pandas_ta
+    st_dir = indicators.supertrend_dir(h, l, c, ST_PERIOD, float(ST_FACTOR))
+    adx = indicators.adx(h, l, c, 14)
+
+    # SMAs (50, 200): full series, the pullback checks walk back through them
+    sma50 = indicators.sma(c, 50)
+    sma200 = indicators.sma(c, 200)
+
+    # RSI (14), upper Bollinger Band (20, 2) and RVOL are only read on the last closed candle
+    rsi = indicators.rsi_last(c[:curr_idx + 1], 14)
+    bb_win = c[curr_idx - 19:curr_idx + 1]
+    bbu = bb_win.mean() + 2 * bb_win.std()
+    rvol = v[curr_idx] / v[curr_idx - 19:curr_idx + 1].mean()
+
+    # --- 3. EVALUATE STRATEGIES (On Last Closed Candle) ---
+    last_open, last_high, last_low, last_close = o[curr_idx], h[curr_idx], l[curr_idx], c[curr_idx]
+    last_sma50, last_sma200 = sma50[curr_idx], sma200[curr_idx]
+    
+    findings = []
+
+    # -------------------------------------------------------
+    # STRATEGY A: SUPERTREND MOMENTUM (From Backtest)
+    # Logic: Supertrend=1 (Green) + ADX>20 + RVOL>1.5 + RSI<70
+    # -------------------------------------------------------
+    if (st_dir[curr_idx] == 1 and 
+        adx[curr_idx] > ADX_THRESHOLD and 
+        rvol > RVOL_THRESHOLD and 
+        rsi < RSI_MAX):
+        findings.append("SUPERTREND_BUY")
+
+    # -------------------------------------------------------
+    # STRATEGY B: CROSSOVER PULLBACKS
+    # -------------------------------------------------------
+    # Golden Cross Pullback
+    if last_sma50 > last_sma200:
+        touched_ma = (last_low <= last_sma50) or (last_low <= last_sma200)
+        is_green = last_close > last_open
+        if touched_ma and is_green:
+            # Ensure it's a fresh pullback: no green MA touch since the cross
+            if indicators.first_pullback(sma50 <= sma200, ((l <= sma50) | (l <= sma200)) & (c > o), curr_idx):
+                findings.append("GOLDEN_CROSS")
+
+    # Death Cross Pullback
+    if last_sma50 < last_sma200:
+        touched_ma = (last_high >= last_sma50) or (last_high >= last_sma200)
+        is_red = last_close < last_open
+        if touched_ma and is_red:
+            if indicators.first_pullback(sma50 >= sma200, ((h >= sma50) | (h >= sma200)) & (c < o), curr_idx):
+                findings.append("DEATH_CROSS")
+
+    # -------------------------------------------------------
+    # STRATEGY C: 200MA TREND + RSI
+    # -------------------------------------------------------
+    # Bullish: Price > 200MA + RSI <= 35 + Green Candle
+    if (last_close > last_sma200) and (rsi <= 35) and (last_close > last_open):
+        findings.append("STRATEGY_BULLISH_200MA_RSI")
+    
+    # Bearish: Price < 200MA + RSI >= 65 + Red Candle
+    if (last_close < last_sma200) and (rsi >= 65) and (last_close < last_open):
+        findings.append("STRATEGY_BEARISH_200MA_RSI")
+
+    # -------------------------------------------------------
+    # STRATEGY D: TOKEN UNLOCK SHORT
+    # -------------------------------------------------------
+    if asset_name in UNLOCK_TOKENS:
+        unlock_day = UNLOCK_TOKENS[asset_name]
+        next_unlock = get_next_unlock_date(unlock_day)
+        window_start = next_unlock - timedelta(days=DAYS_BEFORE_UNLOCK)
+        now = datetime.now()
+
+        # Inside 7-day window?
+        if window_start <= now <= next_unlock:
+            # Logic: Touch Upper BB + Red Candle
+            touched_bb = last_high >= bbu
+            is_red = last_close < last_open
+            if touched_bb and is_red:
+                findings.append("STRATEGY_UNLOCK_SHORT")
+
+    # --- 4. ROWS FOR market_scans (saved per cycle by save_scans) ---
+    detected_at = last_closed_ts.isoformat()
+    return [{"asset": asset_name, "timeframe": timeframe, "signal_type": signal, "detected_at": detected_at}
+            for signal in findings]
+
+# (asset, timeframe, signal_type) -> detected_at of the last row saved for it.
+# The scan is hourly, so 4h/1d findings repeat for the same closed candle; those rows are already stored.
+# Bounded by symbols x timeframes x signal types, so it never needs purging.
+SAVED_SCANS = {}
+
+async def save_scans(rows):
+    """Upserts a whole scan cycle's new findings in one request, off the event loop."""
+    rows = [row for row in rows
+            if SAVED_SCANS.get((row['asset'], row['timeframe'], row['signal_type'])) != row['detected_at']]
+    if not rows: return
+    try:
+        await asyncio.to_thread(supabase.table('market_scans').upsert(rows, on_conflict="asset,timeframe,signal_type").execute)
+        for row in rows:
+            SAVED_SCANS[(row['asset'], row['timeframe'], row['signal_type'])] = row['detected_at']
+            logger.info("✅ Signal Saved: %s | %s | %s", row['asset'], row['timeframe'], row['signal_type'])
+    except Exception as e:
+        logger.error("Scan Save Error: %s", e)
 
 # ==============================================================================
 #  ALERT CHECKER
 # ==============================================================================
 
+# Fixed projections for the per-cycle alert fetch: only the columns check_alerts reads
+ALERT_COLUMNS = "id,user_id,asset,timeframe,alert_type,target_price,is_recurring,last_triggered_at"
+SIGNAL_ALERT_COLUMNS = "id,user_id,asset,timeframe,alert_type,is_recurring,detected_at"
+
+# User ids per chat id lookup: ~100 UUIDs keep the GET URL around 4KB
+CHAT_ID_PAGE = 100
+
+# Struct-of-arrays view of the price alerts; direction is +1 (above), -1 (below), 0 (never fires)
+PriceAlerts = namedtuple('PriceAlerts', 'idx asset target direction')
+PRICE_DIRECTIONS = {'PRICE_TARGET_ABOVE': 1, 'PRICE_TARGET_BELOW': -1}
+
+def price_alert_columns(alerts):
+    """Splits the price alerts (with a target) out of the alert rows into parallel columns."""
+    idx = [i for i, a in enumerate(alerts) if 'PRICE_TARGET' in a['alert_type'] and a['target_price']]
+    return PriceAlerts(
+        np.array(idx, dtype=np.int64),
+        [alerts[i]['asset'] for i in idx],
+        np.array([alerts[i]['target_price'] for i in idx], dtype=np.float64),
+        np.array([PRICE_DIRECTIONS.get(alerts[i]['alert_type'], 0) for i in idx], dtype=np.int8),
+    )
+
+# Telegram message templates, bound once at import
+PRICE_ALERT_MSG = "💰 <b>PRICE ALERT:</b>\n#{} reached ${} (Target: ${})".format
+SIGNAL_ALERT_MSG = "🚀 <b>SIGNAL ALERT:</b>\n#{} ({})\n<b>{}</b> detected!".format
+
+@lru_cache(maxsize=None)
+def readable_signal(alert_type):
+    """Display name for a signal type; there are only a handful, so each is built once."""
+    if "SUPERTREND" in alert_type: return "SUPERTREND BUY (High Momentum)"
+    if "UNLOCK" in alert_type: return "TOKEN UNLOCK SHORT"
+    return alert_type.replace('_', ' ')
+
+def normalize_alert(alert):
+    """Coerces an alerts row once at fetch time so the checks compare plain values."""
+    try:
+        alert['target_price'] = float(alert['target_price']) if alert.get('target_price') is not None else None
+    except (TypeError, ValueError):
+        alert['target_price'] = None
+    alert['is_recurring'] = bool(alert.get('is_recurring'))
+    return alert
+
+async def fetch_active_alerts():
+    """
+    Loads this cycle's (price alerts, signal alerts) off the event loop (supabase-py is synchronous).
+    Recurring price alerts still inside their 1h cooldown are filtered out server-side, and the
+    pending_signal_alerts view returns only technical alerts with a fresh, not yet sent signal.
+    The two queries fail independently: a broken view must not stop price alerts (and vice versa).
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(hours=1)).isoformat()
+    price_query = supabase.table('alerts').select(ALERT_COLUMNS)\
+        .like('alert_type', 'PRICE_TARGET%')\
+        .or_(f'is_recurring.not.is.true,last_triggered_at.is.null,last_triggered_at.lt."{cutoff}"')
+    signal_query = supabase.table('pending_signal_alerts').select(SIGNAL_ALERT_COLUMNS)
+    results = await asyncio.gather(
+        asyncio.to_thread(price_query.execute),
+        asyncio.to_thread(signal_query.execute),
+        return_exceptions=True)
+
+    alerts = []
+    for name, res in zip(("Price", "Signal"), results):
+        if isinstance(res, Exception):
+            logger.error("%s Alert Fetch Error: %s", name, res)
+            alerts.append([])
+        else:
+            alerts.append([normalize_alert(a) for a in res.data or []])
+    return alerts[0], alerts[1]
+
+def fetch_chat_ids(user_ids):
+    """Maps user_uuid -> telegram_chat_id for the given users (linked users only), CHAT_ID_PAGE ids per request."""
+    chat_ids = {}
+    for i in range(0, len(user_ids), CHAT_ID_PAGE):
+        # Pages keep the in.(...) filter well inside gateway URL limits; a failed page only loses its own users
+        try:
+            res = supabase.table('users').select('user_uuid,telegram_chat_id')\
+                .in_('user_uuid', user_ids[i:i + CHAT_ID_PAGE]).not_.is_('telegram_chat_id', 'null').execute()
+            chat_ids.update((r['user_uuid'], r['telegram_chat_id']) for r in res.data if r.get('telegram_chat_id'))
+        except Exception as e:
+            logger.error("Chat ID Error: %s", e)
+    return chat_ids
+
 async def check_alerts():
     """Checks alerts table and sends Telegram messages."""
     try:
-        response = supabase.table('alerts').select("*").execute()
-        alerts = response.data
-    except Exception as e: return
+        price_alerts, signal_alerts = await fetch_active_alerts()
+    except Exception as e:
+        logger.error("Alert Fetch Error: %s", e)
+        return
 
-    if not alerts: return
+    if not price_alerts and not signal_alerts: return
 
-    for alert in alerts:
-        user_uuid = alert['user_id']
-        asset = alert['asset']
-        alert_type = alert['alert_type']
-        is_recurring = alert.get('is_recurring', False)
-        last_triggered = alert.get('last_triggered_at')
+    pa = price_alert_columns(price_alerts)
 
-        # Get Chat ID
-        try:
-            user_res = supabase.table('users').select('telegram_chat_id').eq('user_uuid', user_uuid).execute()
-            if not user_res.data or not user_res.data[0].get('telegram_chat_id'): continue
-            chat_id = user_res.data[0]['telegram_chat_id']
-        except: continue
-
-        should_trigger = False
-        trigger_msg = ""
-        trigger_timestamp = datetime.now(timezone.utc).isoformat()
-
-        # Check Signal Recency
-        lookback = (datetime.now(timezone.utc) - timedelta(hours=24)).isoformat()
-        search_asset = asset.replace('/USDT', '')
-
-        # 1. Price Alerts
-        if 'PRICE_TARGET' in alert_type:
-            # (Logic handled in loop: cooldown check + live price fetch)
-            if is_recurring and last_triggered:
-                try:
-                    if (datetime.now(timezone.utc) - datetime.fromisoformat(last_triggered)).total_seconds() < 3600: continue
-                except: pass
-            
-            tgt = alert.get('target_price')
-            if tgt:
-                curr = await get_live_price(asset)
-                if curr and ((alert_type == 'PRICE_TARGET_ABOVE' and curr >= tgt) or 
-                             (alert_type == 'PRICE_TARGET_BELOW' and curr <= tgt)):
-                    trigger_msg = f"💰 <b>PRICE ALERT:</b>\n#{asset} reached ${curr} (Target: ${tgt})"
-                    should_trigger = True
-
-        # 2. Strategy Alerts (Supertrend, Crosses, etc.)
+    # One ticker request for every watched asset's live price, alongside one query for every alert owner's chat id
+    price_assets = list(set(pa.asset))
+    chat_ids, live_prices = await asyncio.gather(
+        asyncio.to_thread(fetch_chat_ids, list({a['user_id'] for a in price_alerts + signal_alerts})),
+        get_live_prices(price_assets))
+
+    # Every target test in one vector pass (a missing price is NaN and never fires)
+    curr = np.array([live_prices.get(a) or np.nan for a in pa.asset], dtype=np.float64)
+    hit = ((pa.direction > 0) & (curr >= pa.target)) | ((pa.direction < 0) & (curr <= pa.target))
+
+    # Shared by every price alert fired this cycle so their updates batch together
+    cycle_ts = datetime.now(timezone.utc).isoformat()
+    outbox = []        # (alert, trigger_timestamp, chat_id, message) to send this cycle
+
+    # 1. Price Alerts: only the ones that fired are visited
+    # (alerts still in their cooldown were already filtered out by fetch_active_alerts)
+    for i in pa.idx[hit].tolist():
+        alert = price_alerts[i]
+        chat_id = chat_ids.get(alert['user_id'])
+        if not chat_id: continue
+        asset = alert['asset']
+        outbox.append((alert, cycle_ts, chat_id, PRICE_ALERT_MSG(asset, live_prices[asset], alert['target_price'])))
+
+    # 2. Strategy Alerts (Supertrend, Crosses, etc.)
+    # Each row is already matched to its signal, fired within 24h and newer than the alert's last trigger
+    signal_msgs = {}   # (asset, timeframe, alert_type) -> rendered signal message
+    for alert in signal_alerts:
+        chat_id = chat_ids.get(alert['user_id'])
+        if not chat_id: continue
+
+        asset, timeframe, alert_type = alert['asset'], alert['timeframe'], alert['alert_type']
+        trigger_timestamp = alert['detected_at']
+
+        # Alerts on the same signal share one rendered message
+        key = (asset, timeframe, alert_type)
+        trigger_msg = signal_msgs.get(key)
+        if trigger_msg is None:
+            trigger_msg = signal_msgs[key] = SIGNAL_ALERT_MSG(asset, timeframe, readable_signal(alert_type))
+        outbox.append((alert, trigger_timestamp, chat_id, trigger_msg))
+
+    # Send concurrently; delivered and rejected alerts are deleted or re-armed, transient failures retry next cycle
+    sent = await asyncio.gather(*(send_telegram_message(chat_id, msg) for _, _, chat_id, msg in outbox))
+    expired_ids = []   # One-time alerts to delete
+    rearmed = {}       # last_triggered_at -> recurring alert ids
+    for (alert, trigger_timestamp, _, _), outcome in zip(outbox, sent):
+        if outcome == TG_RETRY: continue
+        if alert['is_recurring']:
+            rearmed.setdefault(trigger_timestamp, []).append(alert['id'])
         else:
-            try:
-                res = supabase.table('market_scans').select("*")\
-                    .eq('asset', search_asset)\
-                    .eq('timeframe', alert['timeframe'])\
-                    .eq('signal_type', alert_type)\
-                    .gte('detected_at', lookback)\
-                    .order('detected_at', desc=True)\
-                    .execute()
-                
-                if res.data:
-                    signal = res.data[0]
-                    sig_time = datetime.fromisoformat(signal['detected_at'])
-                    trigger_timestamp = signal['detected_at']
-
-                    # Recurring check
-                    if is_recurring and last_triggered:
-                        if sig_time <= datetime.fromisoformat(last_triggered): continue
-
-                    # Message Formatting
-                    readable_type = alert_type.replace('_', ' ')
-                    if "SUPERTREND" in alert_type: readable_type = "SUPERTREND BUY (High Momentum)"
-                    elif "UNLOCK" in alert_type: readable_type = "TOKEN UNLOCK SHORT"
-                    
-                    trigger_msg = f"🚀 <b>SIGNAL ALERT:</b>\n#{asset} ({alert['timeframe']})\n<b>{readable_type}</b> detected!"
-                    should_trigger = True
-            except: pass
-
-        # Send
-        if should_trigger:
-            await send_telegram_message(chat_id, trigger_msg)
-            if is_recurring:
-                supabase.table('alerts').update({'last_triggered_at': trigger_timestamp}).eq('id', alert['id']).execute()
-            else:
-                supabase.table('alerts').delete().eq('id', alert['id']).execute()
+            expired_ids.append(alert['id'])
+
+    await asyncio.to_thread(flush_alert_updates, expired_ids, rearmed)
+
+def flush_alert_updates(expired_ids, rearmed):
+    """Applies a cycle's alert bookkeeping in one request per distinct timestamp."""
+    try:
+        if expired_ids:
+            supabase.table('alerts').delete().in_('id', expired_ids).execute()
+        for trigger_timestamp, ids in rearmed.items():
+            supabase.table('alerts').update({'last_triggered_at': trigger_timestamp}).in_('id', ids).execute()
+    except Exception as e: logger.error("Alert Update Error: %s", e)
 
 async def close_exchange():
-    if exchange: await exchange.close()
\ No newline at end of file
+    if exchange: await exchange.close()
+    if tg_session: await tg_session.close()
\ No newline at end of file
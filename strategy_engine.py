@@ -1,13 +1,14 @@
 import os
 import asyncio
 import gc
-import pandas as pd
-import pandas_ta as ta
+import numpy as np
+import indicators
 import ccxt.async_support as ccxt
 import logging
 from datetime import datetime, timedelta, timezone
-from supabase import create_client, Client
+from supabase import Client
 from dotenv import load_dotenv
+from database_manager import supabase
 
 load_dotenv()
 
@@ -15,10 +16,6 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("StrategyEngine")
 
-# --- CONFIGURATION ---
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
-
 # --- WATCHLISTS ---
 MAJOR_COINS = ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'ADA', 'DOGE', 'AVAX', 'LINK', 'MATIC']
 UNLOCK_TOKENS = {
@@ -30,11 +27,15 @@ DAYS_BEFORE_UNLOCK = 7
 BTC_PUMP_THRESHOLD = 7.0  
 TIMEFRAME_UNLOCK = '4h'
 TIMEFRAME_TREND = '1h' 
+BB_LENGTH = 20
+STRATEGY_CONCURRENCY = 10
 
 class StrategyEngine:
     def __init__(self):
-        self.supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+        self.supabase: Client = supabase
         self.exchange = None 
+        # Caps concurrent candle fetches; ccxt's rate limiter still paces the requests
+        self.sem = asyncio.Semaphore(STRATEGY_CONCURRENCY)
 
     async def init_exchange(self):
         """Initialize Exchange Connection with Minimal Caching"""
@@ -48,16 +49,14 @@ class StrategyEngine:
         self.exchange.urls['api']['public'] = 'https://data-api.binance.vision/api/v3'
         self.exchange.enableRateLimit = True
 
-    async def fetch_ohlcv(self, symbol, timeframe, limit=300):
+    async def fetch_bars(self, symbol, timeframe, limit=300):
+        """Raw candles as a float64 array (ts, open, high, low, close, vol)."""
         try:
             bars = await self.exchange.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
             if not bars: return None
-            
-            df = pd.DataFrame(bars, columns=['ts', 'open', 'high', 'low', 'close', 'vol'])
-            df['timestamp'] = pd.to_datetime(df['ts'], unit='ms')
-            return df
+            return np.asarray(bars, dtype=np.float64)
         except Exception as e:
-            logger.error(f"Error fetching {symbol}: {e}")
+            logger.error("Error fetching %s: %s", symbol, e)
             return None
 
     def get_next_unlock_date(self, day):
@@ -75,125 +74,126 @@ class StrategyEngine:
             return datetime(next_year, next_month + 1, day)
 
     async def check_btc_safety(self):
-        df = await self.fetch_ohlcv('BTC/USDT', '4h', limit=20)
-        if df is None: return False
+        bars = await self.fetch_bars('BTC/USDT', '4h', limit=20)
+        if bars is None: return False
         
-        current_price = df.iloc[-1]['close']
-        old_price = df.iloc[0]['open'] 
+        current_price = bars[-1, 4]
+        old_price = bars[0, 1]
         change_pct = ((current_price - old_price) / old_price) * 100
-        
-        del df
-        gc.collect()
 
         if change_pct > BTC_PUMP_THRESHOLD:
             logger.warning(f"⚠️ BTC Pumping ({change_pct:.2f}%). Short Strategies PAUSED.")
             return False
         return True
 
-    async def save_signal(self, asset, timeframe, signal_type, detected_at):
-        data = {
+    @staticmethod
+    def signal_row(asset, timeframe, signal_type):
+        return {
             "asset": asset,
             "timeframe": timeframe,
             "signal_type": signal_type,
-            "detected_at": detected_at
+            "detected_at": datetime.now().isoformat()
         }
+
+    async def save_signals(self, rows):
+        """Upserts every signal from a run in one request, off the event loop."""
+        if not rows: return
         try:
-            self.supabase.table('market_scans').upsert(data, on_conflict="asset,timeframe,signal_type").execute()
-            logger.info(f"✅ SIGNAL SAVED: {asset} [{signal_type}]")
+            await asyncio.to_thread(self.supabase.table('market_scans').upsert(rows, on_conflict="asset,timeframe,signal_type").execute)
+            for row in rows:
+                logger.info("✅ SIGNAL SAVED: %s [%s]", row['asset'], row['signal_type'])
         except Exception as e:
             logger.error(f"Database Error: {e}")
 
     # --- UPDATED: UNLOCK STRATEGY (Pure Signal, No Past Data) ---
     async def run_unlock_strategy(self):
+        """Returns the market_scans rows for tokens that triggered."""
         is_safe = await self.check_btc_safety()
-        if not is_safe: return 
-
-        for token, unlock_day in UNLOCK_TOKENS.items():
-            symbol = f"{token}/USDT"
-            
-            next_unlock = self.get_next_unlock_date(unlock_day)
-            window_start = next_unlock - timedelta(days=DAYS_BEFORE_UNLOCK)
-            now = datetime.now()
-
-            # Only run if we are inside the 7-day window before unlock
-            if not (window_start <= now <= next_unlock):
-                continue 
-
-            df = await self.fetch_ohlcv(symbol, TIMEFRAME_UNLOCK)
-            if df is None: continue
-
-            # Indicator: Bollinger Bands
-            df.ta.bbands(close=df['close'], length=20, std=2, append=True)
-            bbu_col = 'BBU_20_2.0'
-
-            # Logic: Price touched Upper Band AND closed Red (Rejection)
-            last_candle = df.iloc[-2]
-            touched_band = last_candle['high'] >= last_candle[bbu_col]
-            is_red = last_candle['close'] < last_candle['open']
-
-            if touched_band and is_red:
-                await self.save_signal(token, TIMEFRAME_UNLOCK, "STRATEGY_UNLOCK_SHORT", datetime.now().isoformat())
-            
-            # Cleanup
-            del df
-            gc.collect()
-            await asyncio.sleep(1)
+        if not is_safe: return []
+
+        rows = await asyncio.gather(*(self.check_unlock(token, unlock_day) for token, unlock_day in UNLOCK_TOKENS.items()))
+        return [row for row in rows if row]
+
+    async def check_unlock(self, token, unlock_day):
+        symbol = f"{token}/USDT"
+        
+        next_unlock = self.get_next_unlock_date(unlock_day)
+        window_start = next_unlock - timedelta(days=DAYS_BEFORE_UNLOCK)
+        now = datetime.now()
+
+        # Only run if we are inside the 7-day window before unlock
+        if not (window_start <= now <= next_unlock):
+            return
+
+        async with self.sem:
+            # The band on the last closed candle only needs BB_LENGTH bars plus the open one
+            bars = await self.fetch_bars(symbol, TIMEFRAME_UNLOCK, limit=BB_LENGTH + 2)
+        if bars is None or len(bars) < BB_LENGTH + 1: return
+
+        # Indicator: upper Bollinger Band (BB_LENGTH, 2) on the last closed candle,
+        # population std as in pandas_ta
+        bb_win = bars[-BB_LENGTH - 1:-1, 4]
+        bbu = bb_win.mean() + 2 * bb_win.std()
+
+        # Logic: Price touched Upper Band AND closed Red (Rejection)
+        last_candle = bars[-2]
+        touched_band = last_candle[2] >= bbu
+        is_red = last_candle[4] < last_candle[1]
+
+        if touched_band and is_red:
+            return self.signal_row(token, TIMEFRAME_UNLOCK, "STRATEGY_UNLOCK_SHORT")
 
     # --- UPDATED: 200MA STRATEGY (Bullish & Bearish, Pure Signal) ---
     async def run_trend_strategy(self):
-        for token in MAJOR_COINS:
-            symbol = f"{token}/USDT"
-            
+        """Returns the market_scans rows for coins that triggered."""
+        rows = await asyncio.gather(*(self.check_trend(token) for token in MAJOR_COINS))
+        return [row for row in rows if row]
+
+    async def check_trend(self, token):
+        symbol = f"{token}/USDT"
+        
+        async with self.sem:
             # Fetch just enough candles for 200 SMA
-            df = await self.fetch_ohlcv(symbol, TIMEFRAME_TREND, limit=210) 
-            if df is None or len(df) < 200: 
-                del df
-                gc.collect()
-                continue
-
-            df.ta.sma(length=200, append=True)
-            df.ta.rsi(length=14, append=True)
-            
-            sma_col = 'SMA_200'
-            rsi_col = 'RSI_14'
-
-            # Analyze the last closed candle
-            curr = df.iloc[-1]
-            
-            price = curr['close']
-            sma200 = curr[sma_col]
-            rsi = curr[rsi_col]
-            
-            is_green = curr['close'] > curr['open']
-            is_red = curr['close'] < curr['open']
-
-            # 1. BULLISH SETUP:
-            # - Trend: Price > 200 MA
-            # - Trigger: RSI <= 35 (Oversold)
-            # - Confirmation: Green Candle
-            if (price > sma200) and (rsi <= 35) and is_green:
-                await self.save_signal(token, TIMEFRAME_TREND, "STRATEGY_BULLISH_200MA_RSI", datetime.now().isoformat())
-
-            # 2. BEARISH SETUP:
-            # - Trend: Price < 200 MA
-            # - Trigger: RSI >= 65 (Overbought)
-            # - Confirmation: Red Candle
-            elif (price < sma200) and (rsi >= 65) and is_red:
-                await self.save_signal(token, TIMEFRAME_TREND, "STRATEGY_BEARISH_200MA_RSI", datetime.now().isoformat())
-            
-            # Cleanup
-            del df
-            gc.collect()
-            await asyncio.sleep(1)
+            bars = await self.fetch_bars(symbol, TIMEFRAME_TREND, limit=210)
+        if bars is None or len(bars) < 200: return
+
+        # Only the last SMA/RSI values are read, so skip building the full series
+        close = bars[:, 4]
+        sma200 = close[-200:].mean()
+        rsi = indicators.rsi_last(close, 14)
+
+        # Analyze the last closed candle
+        curr = bars[-1]
+        price = curr[4]
+        
+        is_green = curr[4] > curr[1]
+        is_red = curr[4] < curr[1]
+
+        # 1. BULLISH SETUP:
+        # - Trend: Price > 200 MA
+        # - Trigger: RSI <= 35 (Oversold)
+        # - Confirmation: Green Candle
+        if (price > sma200) and (rsi <= 35) and is_green:
+            return self.signal_row(token, TIMEFRAME_TREND, "STRATEGY_BULLISH_200MA_RSI")
+
+        # 2. BEARISH SETUP:
+        # - Trend: Price < 200 MA
+        # - Trigger: RSI >= 65 (Overbought)
+        # - Confirmation: Red Candle
+        elif (price < sma200) and (rsi >= 65) and is_red:
+            return self.signal_row(token, TIMEFRAME_TREND, "STRATEGY_BEARISH_200MA_RSI")
 
     async def run_all(self):
         logger.info("🚀 Starting Strategy Scan...")
         await self.init_exchange()
         
-        await self.run_unlock_strategy()
-        await self.run_trend_strategy()
-        
-        logger.info("🏁 Scan Complete.")
-        await self.exchange.close()
-        self.exchange = None
-        gc.collect()
\ No newline at end of file
+        # Close the exchange even if a strategy raises, so its sockets don't leak
+        try:
+            rows = await self.run_unlock_strategy() + await self.run_trend_strategy()
+            # Both strategies' signals in one upsert
+            await self.save_signals(rows)
+            logger.info("🏁 Scan Complete.")
+        finally:
+            await self.exchange.close()
+            self.exchange = None
+            gc.collect()
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Dashboard signal feed (/api/signals): newest 50 scans, optionally filtered by signal_type.
+-- Both shapes become an index range scan that stops after 50 rows instead of a sort over the table.
+create index if not exists idx_market_scans_type_recent
+    on public.market_scans (signal_type, detected_at desc);
+
+create index if not exists idx_market_scans_recent
+    on public.market_scans (detected_at desc);
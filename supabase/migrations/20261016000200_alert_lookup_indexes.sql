@@ -0,0 +1,10 @@
+-- Alert dispatcher lookups (signal_engine.check_alerts).
+-- market_scans is already keyed by the unique (asset, timeframe, signal_type) constraint that
+-- the scanner's upsert relies on, so the per-alert scan lookup needs no extra index.
+
+-- Chat id lookup by user: only linked users can receive alerts, and carrying the chat id in the
+-- index lets Postgres answer with an index-only scan. The engines' chat id lookups repeat the
+-- telegram_chat_id is not null predicate so the planner can use this partial index.
+create index if not exists idx_users_linked
+    on public.users (user_uuid) include (telegram_chat_id)
+    where telegram_chat_id is not null;
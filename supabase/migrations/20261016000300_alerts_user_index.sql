@@ -0,0 +1,4 @@
+-- Dashboard "My Alerts" list (/api/my-alerts): a user's alerts, by user_id.
+-- Including the listed columns lets Postgres answer it with an index-only scan.
+create index if not exists idx_alerts_user
+    on public.alerts (user_id) include (id, asset, timeframe, alert_type);
@@ -0,0 +1,19 @@
+-- /start linking (run_bot.start_command) as a server-side function.
+-- PL/pgSQL keeps the UPDATE's plan cached per connection, the equivalent of a prepared
+-- statement, and the bot gets back a single boolean instead of the updated users row.
+-- Parameters take the columns' own types, so PostgREST coerces the RPC's JSON into them
+-- exactly as it did for the plain .update() (e.g. a bigint telegram_chat_id from a string).
+create or replace function public.link_telegram_user(
+    p_user_uuid public.users.user_uuid%TYPE,
+    p_chat_id public.users.telegram_chat_id%TYPE)
+returns boolean
+language plpgsql
+as $$
+begin
+    update public.users set telegram_chat_id = p_chat_id where user_uuid = p_user_uuid;
+    return found;
+end;
+$$;
+
+-- By name: the resolved argument types depend on the users schema
+revoke execute on function public.link_telegram_user from public, anon, authenticated;
@@ -0,0 +1,9 @@
+-- The hourly scan re-upserts every 4h/1d finding with the same candle timestamp until that candle
+-- closes, so most conflict updates rewrite an identical row. Skip those writes entirely, and leave
+-- page headroom so the real ones can be HOT updates that don't touch the indexes.
+drop trigger if exists market_scans_skip_redundant_updates on public.market_scans;
+create trigger market_scans_skip_redundant_updates
+    before update on public.market_scans
+    for each row execute function suppress_redundant_updates_trigger();
+
+alter table public.market_scans set (fillfactor = 70);
@@ -0,0 +1,5 @@
+-- Per-cycle alert fetch (signal_engine.fetch_active_alerts): price alerts by
+-- alert_type prefix, minus recurring ones triggered within the last hour.
+-- text_pattern_ops lets the LIKE 'PRICE_TARGET%' prefix match use the index.
+create index if not exists idx_alerts_type_last_triggered
+    on public.alerts (alert_type text_pattern_ops, last_triggered_at);
@@ -0,0 +1,20 @@
+-- Technical alerts that should fire now (signal_engine.fetch_active_alerts): each alert joined
+-- to its market_scans row, kept only when the signal is from the last 24h and, for recurring
+-- alerts, newer than the last trigger. The join uses market_scans' (asset, timeframe, signal_type)
+-- upsert key; scans store the bare asset ("BTC"), alerts the pair ("BTC/USDT").
+create or replace view public.pending_signal_alerts
+with (security_invoker = true)
+as
+select a.id, a.user_id, a.asset, a.timeframe, a.alert_type, a.is_recurring, s.detected_at
+from public.alerts a
+join public.market_scans s
+    on s.asset = replace(a.asset, '/USDT', '')
+   and s.timeframe = a.timeframe
+   and s.signal_type = a.alert_type
+where a.alert_type not like 'PRICE_TARGET%'
+  and s.detected_at >= now() - interval '24 hours'
+  and (not coalesce(a.is_recurring, false)
+       or a.last_triggered_at is null
+       or s.detected_at > a.last_triggered_at);
+
+revoke all on public.pending_signal_alerts from public, anon, authenticated;
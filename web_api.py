@@ -3,13 +3,16 @@ import time
 import json
 import re
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 import ccxt
 from flask import Flask, render_template, jsonify, request
 from flask_cors import CORS
-from supabase import create_client, Client
 from dotenv import load_dotenv
+from database_manager import supabase, SUPABASE_URL
 
 # --- AI & ANALYTICS IMPORTS ---
 from google import genai
@@ -27,19 +30,11 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(level
 logger = logging.getLogger("WebAPI")
 
 # Setup Keys & Clients
-SUPABASE_URL = os.environ.get("SUPABASE_URL")
-SUPABASE_KEY = os.environ.get("SUPABASE_SERVICE_ROLE_KEY") or os.environ.get("SUPABASE_KEY")
 BOT_USERNAME = os.environ.get("BOT_USERNAME", "CryptoPulse_Bot")
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
 NIXTLA_API_KEY = os.environ.get("NIXTLA_API_KEY")
 
-if not SUPABASE_URL or not SUPABASE_KEY:
-    logger.critical("❌ Missing Supabase Config!")
-    exit(1)
-
-# Initialize Clients
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
+# Initialize Clients (Supabase comes from database_manager)
 # Gemini Client
 client = None
 if GEMINI_API_KEY:
@@ -61,10 +56,26 @@ else:
 # CCXT Exchange (For fetching historical data for Nixtla)
 exchange = ccxt.binance({'enableRateLimit': True})
 
+# Shared HTTP pool for outbound calls (Binance price, Yahoo search)
+# Reuses TCP/TLS connections across requests instead of a new handshake per call
+http = requests.Session()
+http.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+# Markdown code fences Gemini wraps around its JSON answer (compiled once)
+JSON_FENCE_RE = re.compile(r"```json|```")
+
 # ==============================================================================
 #  HELPER FUNCTIONS (Nixtla & Data Fetching)
 # ==============================================================================
 
+@lru_cache(maxsize=256)
+def normalize_symbol(symbol):
+    """TradingView-style symbol to CCXT form (e.g. "BINANCE:BTCUSDT" -> "BTC/USDT"), parsed once per symbol."""
+    clean_symbol = symbol.replace('BINANCE:', '').replace(':', '')
+    if '/' not in clean_symbol and 'USDT' in clean_symbol:
+        clean_symbol = clean_symbol.replace('USDT', '/USDT')
+    return clean_symbol
+
 def fetch_ohlcv_data(symbol, timeframe='4h', limit=500):
     """
     Fetches historical candle data using CCXT (Binance).
@@ -72,9 +83,7 @@ def fetch_ohlcv_data(symbol, timeframe='4h', limit=500):
     """
     try:
         # Normalize symbol for CCXT (e.g. "BINANCE:BTCUSDT" -> "BTC/USDT")
-        clean_symbol = symbol.replace('BINANCE:', '').replace(':', '')
-        if '/' not in clean_symbol and 'USDT' in clean_symbol:
-            clean_symbol = clean_symbol.replace('USDT', '/USDT')
+        clean_symbol = normalize_symbol(symbol)
         
         # Normalize timeframe (e.g. "1D" -> "1d")
         timeframe = timeframe.lower()
@@ -83,7 +92,7 @@ def fetch_ohlcv_data(symbol, timeframe='4h', limit=500):
         ohlcv = exchange.fetch_ohlcv(clean_symbol, timeframe, limit=limit)
         
         # Convert to Pandas DataFrame
-        df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        df = pd.DataFrame(np.asarray(ohlcv, dtype=np.float64), columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'], copy=False)
         df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
         
         # Format for Nixtla: 'ds' (Date) and 'y' (Target Value/Close Price)
@@ -138,19 +147,25 @@ def get_nixtla_prediction(symbol, timeframe):
 def health_check():
     return jsonify({"status": "ok"}), 200
 
+# Public client config never changes while the process runs, so it is read once at import
+PUBLIC_CONFIG = {
+    "SUPABASE_URL": SUPABASE_URL,
+    "SUPABASE_KEY": os.environ.get("SUPABASE_KEY"),
+    "BOT_USERNAME": BOT_USERNAME
+}
+
 @app.route('/api/config')
 def api_config():
-    return jsonify({
-        "SUPABASE_URL": SUPABASE_URL,
-        "SUPABASE_KEY": os.environ.get("SUPABASE_KEY"),
-        "BOT_USERNAME": BOT_USERNAME
-    })
+    return jsonify(PUBLIC_CONFIG)
+
+# Fields the dashboard's signal tables render
+SIGNAL_COLUMNS = "asset,timeframe,signal_type,detected_at"
 
 @app.route('/api/signals')
 def api_signals():
     sig_type = request.args.get('type', 'ALL')
     try:
-        query = supabase.table('market_scans').select("*").order('detected_at', desc=True).limit(50)
+        query = supabase.table('market_scans').select(SIGNAL_COLUMNS).order('detected_at', desc=True).limit(50)
         if sig_type != 'ALL':
             query = query.eq('signal_type', sig_type)
         response = query.execute()
@@ -159,12 +174,15 @@ def api_signals():
         logger.error(f"Signal API Error: {e}")
         return jsonify([])
 
+# Fields the "My Alerts" list renders; the rest of the row stays in the database
+MY_ALERT_COLUMNS = "id,asset,timeframe,alert_type"
+
 @app.route('/api/my-alerts')
 def api_my_alerts():
     user_id = request.args.get('user_id')
     if not user_id: return jsonify([])
     try:
-        response = supabase.table('alerts').select("*").eq('user_id', user_id).execute()
+        response = supabase.table('alerts').select(MY_ALERT_COLUMNS).eq('user_id', user_id).execute()
         return jsonify(response.data)
     except Exception as e:
         return jsonify({"error": str(e)})
@@ -182,7 +200,7 @@ def api_create_alert():
             try:
                 symbol_clean = asset.replace('/', '') 
                 url = f"https://data-api.binance.vision/api/v3/ticker/price?symbol={symbol_clean}"
-                price_res = requests.get(url, timeout=2).json()
+                price_res = http.get(url, timeout=2).json()
                 current_price = float(price_res['price'])
                 target = float(target_price)
                 signal_type = "PRICE_TARGET_ABOVE" if target > current_price else "PRICE_TARGET_BELOW"
@@ -198,7 +216,9 @@ def api_create_alert():
             "is_recurring": is_recurring,
             "status": "ACTIVE"
         }).execute()
-        return jsonify({"success": True, "data": response.data})
+        # PostgREST hands the inserted row back in the same round trip; the UI only needs its id
+        new_id = response.data[0]['id'] if response.data else None
+        return jsonify({"success": True, "id": new_id})
     except Exception as e:
         return jsonify({"success": False, "error": str(e)})
 
@@ -283,7 +303,7 @@ def api_analyze_chart():
             raise ai_error
         
         # 4. Parse Response
-        text = re.sub(r"```json|```", "", response.text.strip()).strip()
+        text = JSON_FENCE_RE.sub("", response.text.strip()).strip()
         try: ai_data = json.loads(text)
         except: ai_data = {}
         
@@ -309,7 +329,7 @@ def api_search_proxy():
     try:
         headers = {'User-Agent': 'Mozilla/5.0'}
         url = f"https://query1.finance.yahoo.com/v1/finance/search?q={query}&quotesCount=6&newsCount=0"
-        response = requests.get(url, headers=headers)
+        response = http.get(url, headers=headers)
         data = response.json()
         results = []
         if 'quotes' in data: